@@ -6,34 +6,69 @@ from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.metrics import accuracy_score, mean_squared_error
 import lightgbm as lgb
 from datetime import datetime, timedelta
+from preprocessing.schema import TRANSACTION_SCHEMA, read_frame, memory_report
 import warnings
 warnings.filterwarnings('ignore')
 
 
 class SportsRetailAI:
-    def __init__(self, data_path='data/CS_Main.xlsx'):
-        """Initialize the AI enhancement module"""
-        self.data = pd.read_excel(data_path)
+    def __init__(self, data_path='data/CS_Main.xlsx', feature_store=None):
+        """Initialize the AI enhancement module
+
+        feature_store: optional CustomerFeatureStore; when given, customer aggregates are read
+        from it, and the full transaction history is only loaded if a method that needs it
+        (recommendations, pricing, inventory forecast) is called. Store dates are day-granular,
+        like preprocess_customer_d1.
+        """
+        self.data_path = data_path
+        self.feature_store = feature_store
+        self._data = None
+        self._product_features = None
+        self.memory_report = None
         self.today = pd.to_datetime('today').normalize()
         self.customer_features = self._engineer_customer_features()
-        self.product_features = self._engineer_product_features()
         self.scaler = StandardScaler()
+
+    @property
+    def data(self):
+        """Full transaction history, read on first use"""
+        if self._data is None:
+            report = []
+            self._data = read_frame(self.data_path, TRANSACTION_SCHEMA, report=report)
+            self.memory_report = memory_report(report)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def product_features(self):
+        if self._product_features is None:
+            self._product_features = self._engineer_product_features()
+        return self._product_features
         
     def _engineer_customer_features(self):
-        data = self.data.copy()
-        data['purchase_date'] = pd.to_datetime(data['purchase_date'])
-        group = data.groupby('customer_id').agg(
-            Monetary=('total_amount', 'sum'),
-            total_quantity=('quantity', 'sum'),
-            Frequency=('transaction_id', 'count'),
-            num_unique_products=('product_id', 'nunique'),
-            last_purchase_date=('purchase_date', 'max'),
-            avg_price_per_unit=('price_per_unit', 'mean'),
-            store_visit_frequency=('purchase_date', 'nunique'),
-        ).reset_index()
-        membership_start = data.groupby('customer_id')['purchase_date'].min().reset_index()
-        membership_start.rename(columns={'purchase_date':'membership_start_date'}, inplace=True)
-        group = group.merge(membership_start, on='customer_id', how='left')
+        if self.feature_store is not None:
+            group = self.feature_store.customer_features(recency_date=self.today)
+            group = group[['customer_id', 'Monetary', 'total_quantity', 'Frequency', 'num_unique_products',
+                           'last_purchase_date', 'avg_price_per_unit', 'store_visit_frequency',
+                           'membership_start_date']]
+        else:
+            data = self.data.copy()
+            data['purchase_date'] = pd.to_datetime(data['purchase_date'])
+            group = data.groupby('customer_id', observed=True).agg(
+                Monetary=('total_amount', 'sum'),
+                total_quantity=('quantity', 'sum'),
+                Frequency=('transaction_id', 'count'),
+                num_unique_products=('product_id', 'nunique'),
+                last_purchase_date=('purchase_date', 'max'),
+                avg_price_per_unit=('price_per_unit', 'mean'),
+                store_visit_frequency=('purchase_date', 'nunique'),
+            ).reset_index()
+            membership_start = data.groupby('customer_id', observed=True)['purchase_date'].min().reset_index()
+            membership_start.rename(columns={'purchase_date':'membership_start_date'}, inplace=True)
+            group = group.merge(membership_start, on='customer_id', how='left')
         group['days_since_last_purchase'] = (self.today - group['last_purchase_date']).dt.days
         group['membership_duration_months'] = ((self.today - group['membership_start_date']).dt.days / 30).clip(lower=1)
         group['purchase_frequency'] = group['Frequency'] / group['membership_duration_months']
@@ -43,7 +78,7 @@ class SportsRetailAI:
     def _engineer_product_features(self):
         data = self.data.copy()
         data['purchase_date'] = pd.to_datetime(data['purchase_date'])
-        group = data.groupby('product_id').agg(
+        group = data.groupby('product_id', observed=True).agg(
             total_quantity_sold=('quantity', 'sum'),
             avg_price_per_unit=('price_per_unit', 'mean'),
             num_customers=('customer_id', 'nunique'),
@@ -97,7 +132,8 @@ class SportsRetailAI:
             values='quantity',
             index='customer_id',
             columns='product_id',
-            fill_value=0
+            fill_value=0,
+            observed=True
         )
         if int(customer_id) not in user_item.index:
             return "Customer not found"
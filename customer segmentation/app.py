@@ -7,7 +7,10 @@ from dotenv import load_dotenv
 from flask import Flask, render_template, request, send_file, jsonify
 from tensorflow.keras.models import load_model
 from preprocessing.preprocessing import process_customer_d1frame, preprocess_customer_d1
+from preprocessing.churn import score_churn
 from preprocessing.bundling import recommend_dead_stock_products
+from preprocessing.schema import TRANSACTION_SCHEMA, read_frame, memory_report
+from preprocessing.resegment import ModelRegistry
 from twilio.rest import Client
 
 # Load environment variables
@@ -19,8 +22,9 @@ if not app.secret_key:
     raise RuntimeError("SECRET_KEY environment variable not set. Please set it in .env file")
 
 # Load ML models and scalers
-model = pickle.load(open('Models/CS_model.pkl', 'rb'))
-scaler = pickle.load(open('Models/CS_scalers.pkl', 'rb'))
+# The CS model/scaler come from the registry so re-segmented versions are picked up without a restart
+cs_registry = ModelRegistry('Models')
+cs_registry.get()
 churn_model = load_model('Models/churn_model.h5')
 churn_scaler = pickle.load(open('Models/churn_scaler.pkl', 'rb'))
 
@@ -67,15 +71,7 @@ def send_sms(to_number, message, mock=True):
 
 
 def churn_prediction(input_df, model, scaler):
-    data = preprocess_customer_d1(input_df)
-    data = data[['customer_id', 'Monetary', 'Frequency', 'Avg_purchase_gap_days', 'Recency']]
-    features = data[['Monetary', 'Frequency', 'Avg_purchase_gap_days', 'Recency']]
-    scaled = scaler.transform(features)
-    pred_probs = model.predict(scaled)
-    data['churn_prediction'] = (pred_probs[:, 0] > 0.5).astype(int)
-    data['prediction_probability'] = pred_probs[:, 0]
-    data['risk_level'] = ['High' if p > 0.7 else 'Medium' if p > 0.3 else 'Low' for p in pred_probs[:, 0]]
-    return data
+    return score_churn(preprocess_customer_d1(input_df), model, scaler)
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -92,11 +88,11 @@ def index():
             file = request.files['file']
             if file and file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
                 try:
-                    if file.filename.lower().endswith('.csv'):
-                        global_input_df = pd.read_csv(file)
-                    else:
-                        global_input_df = pd.read_excel(file)
+                    report = []
+                    global_input_df = read_frame(file, TRANSACTION_SCHEMA, report=report)
+                    print(memory_report(report).to_string(index=False))
 
+                    model, scaler = cs_registry.get()
                     final = process_customer_d1frame(global_input_df, model=model, scaler=scaler)
 
                     # Churn prediction
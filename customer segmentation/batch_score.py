@@ -0,0 +1,262 @@
+"""Offline batch scoring without the Flask app.
+
+Runs the same segmentation, churn, reward and (optionally) bundling steps as the index route
+over one or more transaction extracts:
+
+    python batch_score.py data/nightly_*.csv --out output/nightly --workers 4 --format parquet
+
+Inputs are read in chunks and hash-partitioned by customer_id, so every customer's history ends up
+in a single partition. Worker processes load the models once and score partitions in parallel.
+Loyalty tiers are ranked on cluster totals summed over all partitions, matching a single-frame run.
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from preprocessing.schema import TRANSACTION_SCHEMA, optimize_dtypes, normalize_ids, read_frame_chunks
+from preprocessing.preprocessing import (CS_FEATURES, preprocess_customer_d1, cluster_totals,
+                                         loyalty_mapping, apply_rewards)
+from preprocessing.churn import load_churn_models, score_churn
+from preprocessing.resegment import ModelRegistry
+from preprocessing.bundling import recommend_dead_stock_products
+
+STOCK_FILE = 'data/stock_data2.xlsx'
+CHURN_COLUMNS = ['customer_id', 'churn_prediction', 'prediction_probability', 'risk_level']
+
+# Per-process model cache, filled by _init_worker
+_worker = {}
+
+
+def _init_worker(models_dir):
+    registry = ModelRegistry(models_dir)
+    _worker['model'], _worker['scaler'] = registry.get()
+    _worker['cs_version'] = registry.version
+    _worker['churn_model'], _worker['churn_scaler'] = load_churn_models(models_dir)
+
+
+def partition_inputs(paths, tx_dir, n_partitions, chunksize):
+    """Spill input chunks into tx_dir/part-NNNNN/ by customer_id hash.
+
+    Returns (rows kept, rows dropped for a missing customer_id, latest purchase date) so every
+    partition uses the same reference date.
+    """
+    n_rows, n_dropped, max_date, seq = 0, 0, None, 0
+    for path in paths:
+        for chunk in read_frame_chunks(path, TRANSACTION_SCHEMA, chunksize):
+            # Ids must hash the same way in every chunk
+            kept = normalize_ids(chunk)
+            n_dropped += len(chunk) - len(kept)
+            if kept.empty:
+                continue
+            chunk_max = pd.to_datetime(kept['purchase_date']).max()
+            max_date = chunk_max if max_date is None else max(max_date, chunk_max)
+            n_rows += len(kept)
+
+            keys = pd.util.hash_pandas_object(kept['customer_id'].astype(str), index=False).values
+            for part, piece in kept.groupby(keys % n_partitions):
+                part_dir = os.path.join(tx_dir, f'part-{part:05d}')
+                os.makedirs(part_dir, exist_ok=True)
+                piece.to_pickle(os.path.join(part_dir, f'{seq:06d}.pkl'))
+            seq += 1
+    return n_rows, n_dropped, max_date
+
+
+def _load_transactions(part_dirs):
+    pieces = [pd.read_pickle(os.path.join(d, f))
+              for d in part_dirs for f in sorted(os.listdir(d))]
+    # Chunks can carry different category sets, so re-apply the policy after concat
+    return optimize_dtypes(pd.concat(pieces, ignore_index=True), TRANSACTION_SCHEMA)
+
+
+def _score_partition(part_dir, feature_path, reference_date):
+    timings = {}
+    t = time.perf_counter()
+    tx = _load_transactions([part_dir])
+    timings['load'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    d1 = preprocess_customer_d1(tx, reference_date)
+    timings['features'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    d1['cluster'] = _worker['model'].predict(_worker['scaler'].transform(d1[CS_FEATURES]))
+    timings['segmentation'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    churn = score_churn(d1, _worker['churn_model'], _worker['churn_scaler'])
+    timings['churn'] = time.perf_counter() - t
+
+    pd.to_pickle((d1, churn[CHURN_COLUMNS]), feature_path)
+    return {
+        'rows': len(tx),
+        'customers': len(d1),
+        'totals': cluster_totals(d1),
+        'cs_version': _worker['cs_version'],
+        'timings': timings,
+    }
+
+
+def _reward_partition(feature_path, mapping, out_path, fmt):
+    timings = {}
+    d1, churn = pd.read_pickle(feature_path)
+
+    t = time.perf_counter()
+    final = apply_rewards(d1, mapping)
+    final = final.merge(churn, on='customer_id', how='left')
+    timings['rewards'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if fmt == 'parquet':
+        final.to_parquet(out_path, index=False)
+    else:
+        final.to_csv(out_path, index=False)
+    timings['write'] = time.perf_counter() - t
+    return {'timings': timings}
+
+
+def _bundle(part_dirs, products, stock_file):
+    t = time.perf_counter()
+    tx = _load_transactions(part_dirs)
+    rows = []
+    for product in products:
+        try:
+            recommended = recommend_dead_stock_products([product], tx, stock_file)
+            rows.append({'input_product': product, 'recommended_products': ', '.join(recommended), 'error': ''})
+        except ValueError as e:
+            rows.append({'input_product': product, 'recommended_products': '', 'error': str(e)})
+    return {'rows': rows, 'timings': {'bundling': time.perf_counter() - t}}
+
+
+def _add_timings(total, timings):
+    for stage, seconds in timings.items():
+        total[stage] = total.get(stage, 0.0) + seconds
+
+
+def run(inputs, out_dir, workers=None, partitions=None, chunksize=100000, models_dir='Models',
+        fmt='csv', bundle_products=None, stock_file=STOCK_FILE, keep_work=False):
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or workers
+
+    # Outputs of an earlier run into the same directory must not leak into this one
+    seg_dir = os.path.join(out_dir, 'segments')
+    shutil.rmtree(seg_dir, ignore_errors=True)
+    bundle_path = os.path.join(out_dir, 'bundling.csv')
+    if os.path.exists(bundle_path):
+        os.remove(bundle_path)
+    os.makedirs(seg_dir)
+
+    # A fresh work dir per run, so spill files from a kept or crashed run are never re-read
+    work_dir = tempfile.mkdtemp(prefix='_work-', dir=out_dir)
+    tx_dir = os.path.join(work_dir, 'transactions')
+    feature_dir = os.path.join(work_dir, 'features')
+    os.makedirs(tx_dir)
+    os.makedirs(feature_dir)
+
+    wall = {}
+    worker_time = {}
+    started = time.perf_counter()
+    try:
+        t = time.perf_counter()
+        n_rows, n_dropped, reference_date = partition_inputs(inputs, tx_dir, partitions, chunksize)
+        wall['read_partition'] = time.perf_counter() - t
+        if n_rows == 0:
+            raise ValueError("No transactions found in the input files.")
+
+        part_names = sorted(os.listdir(tx_dir))
+        ctx = mp.get_context('spawn')  # TensorFlow is not fork-safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(models_dir,)) as pool:
+            bundle_future = None
+            if bundle_products:
+                bundle_future = pool.submit(_bundle, [os.path.join(tx_dir, p) for p in part_names],
+                                            bundle_products, stock_file)
+
+            t = time.perf_counter()
+            futures = [pool.submit(_score_partition, os.path.join(tx_dir, p),
+                                   os.path.join(feature_dir, p + '.pkl'), reference_date)
+                       for p in part_names]
+            scored = [f.result() for f in futures]
+            wall['score'] = time.perf_counter() - t
+            for res in scored:
+                _add_timings(worker_time, res['timings'])
+
+            # Tiers are ranked on global cluster totals, not per partition
+            mapping = loyalty_mapping(pd.concat([res['totals'] for res in scored], ignore_index=True))
+
+            t = time.perf_counter()
+            ext = 'parquet' if fmt == 'parquet' else 'csv'
+            outputs = [os.path.join(seg_dir, f'{p}.{ext}') for p in part_names]
+            futures = [pool.submit(_reward_partition, os.path.join(feature_dir, p + '.pkl'), mapping, out, fmt)
+                       for p, out in zip(part_names, outputs)]
+            for f in futures:
+                _add_timings(worker_time, f.result()['timings'])
+            wall['rewards_write'] = time.perf_counter() - t
+
+            if bundle_future is not None:
+                t = time.perf_counter()
+                bundled = bundle_future.result()
+                wall['bundling_wait'] = time.perf_counter() - t
+                _add_timings(worker_time, bundled['timings'])
+                pd.DataFrame(bundled['rows']).to_csv(bundle_path, index=False)
+                outputs.append(bundle_path)
+    finally:
+        if keep_work:
+            print(f"Intermediate files kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    wall['total'] = time.perf_counter() - started
+
+    summary = {
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'inputs': list(inputs),
+        'rows': n_rows,
+        'rows_without_customer_id': n_dropped,
+        'customers': sum(res['customers'] for res in scored),
+        'reference_date': str(pd.to_datetime(reference_date).date()),
+        'partitions': len(part_names),
+        'workers': workers,
+        'cs_model_versions': sorted({res['cs_version'] or 'base' for res in scored}),
+        'loyalty_mapping': mapping.to_dict(orient='records'),
+        'wall_seconds': {k: round(v, 3) for k, v in wall.items()},
+        'worker_seconds': {k: round(v, 3) for k, v in worker_time.items()},
+        'outputs': outputs,
+    }
+    with open(os.path.join(out_dir, 'run_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score transaction extracts offline (segmentation, churn, rewards, bundling).')
+    parser.add_argument('inputs', nargs='+', help='transaction CSV/Excel files, scored together as one extract')
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--partitions', type=int, default=None, help='customer partitions (default: workers)')
+    parser.add_argument('--chunksize', type=int, default=100000, help='rows per input read')
+    parser.add_argument('--models-dir', default='Models')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--bundle-products', nargs='*', default=None, help='product names to run bundling for')
+    parser.add_argument('--stock-file', default=STOCK_FILE)
+    parser.add_argument('--keep-work', action='store_true', help='keep intermediate partition files')
+    args = parser.parse_args(argv)
+
+    summary = run(args.inputs, args.out, workers=args.workers, partitions=args.partitions,
+                  chunksize=args.chunksize, models_dir=args.models_dir, fmt=args.format,
+                  bundle_products=args.bundle_products, stock_file=args.stock_file,
+                  keep_work=args.keep_work)
+    print(f"✅ Scored {summary['customers']} customers from {summary['rows']} rows "
+          f"in {summary['wall_seconds']['total']}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
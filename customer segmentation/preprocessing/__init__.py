@@ -1,4 +1,6 @@
-from .process import preprocess_customer_data, apply_reward_rules
+from .process import preprocess_customer_data, load_customer_data, apply_reward_rules
 from .preprocessing import process_customer_d1frame,preprocess_customer_d1
 from .bundling import recommend_dead_stock_products
-from .churn import churn_prediction
\ No newline at end of file
+from .churn import churn_prediction
+from .schema import TRANSACTION_SCHEMA, DEMOGRAPHIC_SCHEMA, optimize_dtypes, read_frame, memory_report
+from .feature_store import CustomerFeatureStore
\ No newline at end of file
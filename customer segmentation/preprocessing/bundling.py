@@ -12,7 +12,7 @@ def get_dead_stock_items(stock_data, threshold=0.6):
 
 # Step 2: Preprocess transaction data into basket format
 def preprocess_basket_data(data):
-    basket_data = data.groupby('transaction_id')['product_name'].apply(list).tolist()
+    basket_data = data.groupby('transaction_id', observed=True)['product_name'].apply(list).tolist()
     te = TransactionEncoder()
     te_ary = te.fit(basket_data).transform(basket_data)
     basket = pd.DataFrame(te_ary, columns=te.columns_)
@@ -1,33 +1,33 @@
 
 from preprocessing.preprocessing import preprocess_customer_d1
+import os
 import pickle
 from tensorflow.keras.models import load_model
 
-scaler = pickle.load(open('Models\churn_scaler.pkl', 'rb'))
-model=load_model('Models\churn_model.h5')
+CHURN_FEATURES = ['Monetary', 'Frequency', 'Avg_purchase_gap_days', 'Recency']
 
+_churn_models = {}
 
-def churn_prediction(input):
-
-    data=preprocess_customer_d1(input)
-    data=data[['Monetary','Frequency','Avg_purchase_gap_days','Recency']] 
-
-    # Step 2: Scale the features
-    data_scaled = scaler.transform(data)
+def load_churn_models(models_dir='Models'):
+    # Loaded on first use (once per process) instead of at import time
+    if models_dir not in _churn_models:
+        scaler = pickle.load(open(os.path.join(models_dir, 'churn_scaler.pkl'), 'rb'))
+        model = load_model(os.path.join(models_dir, 'churn_model.h5'))
+        _churn_models[models_dir] = (model, scaler)
+    return _churn_models[models_dir]
 
-    # Step 3: Predict probabilities
-    prediction = model.predict(data_scaled)
 
-    # Step 4: Generate churn labels (0 or 1)
-    churn_labels = (prediction[:, 0] > 0.5).astype(int)
+def score_churn(d1, model, scaler):
+    """Churn columns for an already preprocessed per-customer frame."""
+    data = d1[['customer_id'] + CHURN_FEATURES].copy()
+    pred_probs = model.predict(scaler.transform(data[CHURN_FEATURES]), verbose=0)
+    data['churn_prediction'] = (pred_probs[:, 0] > 0.5).astype(int)
+    data['prediction_probability'] = pred_probs[:, 0]
+    data['risk_level'] = ['High' if p > 0.7 else 'Medium' if p > 0.3 else 'Low' for p in pred_probs[:, 0]]
+    return data
 
-    # Step 5: Assign risk level based on probabilities
-    risk_levels = ['High' if p > 0.7 else 'Medium' if p > 0.3 else 'Low' for p in prediction[:, 0]]
 
-    # Step 6: Attach results to the input DataFrame
-    input['churn_prediction'] = churn_labels
-    input['prediction_probability'] = prediction[:, 0]
-    input['risk_level'] = risk_levels
-    
-
-    return input
+def churn_prediction(input):
+    model, scaler = load_churn_models()
+    # One row per customer: the scores line up with the preprocessed frame, not the raw rows
+    return score_churn(preprocess_customer_d1(input), model, scaler)
@@ -0,0 +1,208 @@
+# preprocessing/feature_store.py
+
+import os
+import sqlite3
+import argparse
+import pandas as pd
+from datetime import datetime
+
+from .schema import TRANSACTION_SCHEMA, normalize_ids, read_frame
+
+DEFAULT_STORE = 'data/customer_features.db'
+
+_SCHEMA = """
+-- customer_id has INTEGER affinity: numeric ids are stored as integers whether they arrive
+-- as 100, 100.0 or '100', while text ids such as 'CUST1000' stay text
+CREATE TABLE IF NOT EXISTS customer_features (
+    customer_id INTEGER NOT NULL PRIMARY KEY,
+    Monetary NUMERIC NOT NULL DEFAULT 0,
+    total_quantity NUMERIC NOT NULL DEFAULT 0,
+    Frequency INTEGER NOT NULL DEFAULT 0,
+    price_per_unit_sum NUMERIC NOT NULL DEFAULT 0,
+    membership_start_date TEXT,
+    last_purchase_date TEXT,
+    num_unique_products INTEGER NOT NULL DEFAULT 0,
+    store_visit_frequency INTEGER NOT NULL DEFAULT 0,
+    Mobile
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS customer_visits (
+    customer_id INTEGER NOT NULL, visit_date TEXT, PRIMARY KEY (customer_id, visit_date)
+);
+CREATE TABLE IF NOT EXISTS customer_products (
+    customer_id INTEGER NOT NULL, product_id, PRIMARY KEY (customer_id, product_id)
+);
+CREATE TABLE IF NOT EXISTS applied_batches (
+    batch_id TEXT PRIMARY KEY, applied_at TEXT, n_rows INTEGER
+);
+"""
+
+_UPSERT = """
+INSERT INTO customer_features (customer_id, Monetary, total_quantity, Frequency, price_per_unit_sum,
+                               membership_start_date, last_purchase_date, Mobile)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(customer_id) DO UPDATE SET
+    Monetary = Monetary + excluded.Monetary,
+    total_quantity = total_quantity + excluded.total_quantity,
+    Frequency = Frequency + excluded.Frequency,
+    price_per_unit_sum = price_per_unit_sum + excluded.price_per_unit_sum,
+    membership_start_date = MIN(membership_start_date, excluded.membership_start_date),
+    last_purchase_date = MAX(last_purchase_date, excluded.last_purchase_date),
+    Mobile = COALESCE(Mobile, excluded.Mobile)
+"""
+
+# Distinct-count columns are refreshed only for customers touched by the batch
+_REFRESH_COUNTS = """
+UPDATE customer_features SET
+    num_unique_products = (SELECT COUNT(*) FROM customer_products p
+                           WHERE p.customer_id = customer_features.customer_id),
+    store_visit_frequency = (SELECT COUNT(*) FROM customer_visits v
+                             WHERE v.customer_id = customer_features.customer_id)
+WHERE customer_id IN (SELECT customer_id FROM touched)
+"""
+
+
+_SELECT = ("SELECT customer_id, Monetary, total_quantity, Frequency, num_unique_products, "
+           "last_purchase_date, price_per_unit_sum, store_visit_frequency, Mobile, "
+           "membership_start_date FROM customer_features ORDER BY customer_id")
+
+
+def _rows(frame, cols):
+    # sqlite3 only binds plain Python scalars, so go through tolist()
+    return list(zip(*(frame[c].tolist() for c in cols)))
+
+
+class CustomerFeatureStore:
+    """Per-customer aggregates kept in SQLite and updated from append-only transaction batches.
+
+    Only additive state (sums, counts, first/last dates, distinct products/visit days) is stored.
+    Recency and Active_days depend on a reference date, so they are derived in customer_features().
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_batch(self, batch_id):
+        cur = self.conn.execute("SELECT 1 FROM applied_batches WHERE batch_id = ?", (str(batch_id),))
+        return cur.fetchone() is not None
+
+    def apply_batch(self, df, batch_id=None):
+        """Fold a batch of new transactions into the store.
+
+        Returns the number of customers touched. A batch_id that was already applied is skipped,
+        so re-running a day's load does not double count it.
+        """
+        if batch_id is not None and self.has_batch(batch_id):
+            return 0
+        df = normalize_ids(df)
+        if df.empty:
+            return 0
+
+        data = df[['customer_id', 'product_id', 'purchase_date', 'total_amount',
+                   'quantity', 'price_per_unit', 'Mobile']].copy()
+        data['purchase_date'] = pd.to_datetime(data['purchase_date']).dt.strftime('%Y-%m-%d')
+
+        delta = data.groupby('customer_id', observed=True).agg(
+            Monetary=('total_amount', 'sum'),
+            total_quantity=('quantity', 'sum'),
+            Frequency=('customer_id', 'size'),
+            price_per_unit_sum=('price_per_unit', 'sum'),
+            membership_start_date=('purchase_date', 'min'),
+            last_purchase_date=('purchase_date', 'max'),
+            Mobile=('Mobile', 'first'),
+        ).reset_index()
+        delta['Mobile'] = delta['Mobile'].astype(object).where(delta['Mobile'].notna(), None)
+        visits = data[['customer_id', 'purchase_date']].drop_duplicates()
+        products = data[['customer_id', 'product_id']].drop_duplicates()
+
+        with self.conn:
+            self.conn.executemany(_UPSERT, _rows(delta, [
+                'customer_id', 'Monetary', 'total_quantity', 'Frequency', 'price_per_unit_sum',
+                'membership_start_date', 'last_purchase_date', 'Mobile']))
+            self.conn.executemany("INSERT OR IGNORE INTO customer_visits VALUES (?, ?)",
+                                  _rows(visits, ['customer_id', 'purchase_date']))
+            self.conn.executemany("INSERT OR IGNORE INTO customer_products VALUES (?, ?)",
+                                  _rows(products, ['customer_id', 'product_id']))
+
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS touched (customer_id INTEGER NOT NULL PRIMARY KEY) WITHOUT ROWID")
+            self.conn.execute("DELETE FROM touched")
+            self.conn.executemany("INSERT INTO touched VALUES (?)", _rows(delta, ['customer_id']))
+            self.conn.execute(_REFRESH_COUNTS)
+
+            if batch_id is not None:
+                self.conn.execute("INSERT INTO applied_batches VALUES (?, ?, ?)",
+                                  (str(batch_id), datetime.now().isoformat(timespec='seconds'), len(df)))
+        return len(delta)
+
+    def customer_features(self, reference_date=None, recency_date=None):
+        """Return the same per-customer frame as preprocess_customer_d1.
+
+        Active_days is measured up to reference_date (default: latest purchase in the store) and
+        Recency up to recency_date (default: today).
+        """
+        d1 = pd.read_sql_query(_SELECT, self.conn)
+        return _derive(d1, reference_date, recency_date)
+
+    def iter_customer_features(self, chunksize=50000, reference_date=None, recency_date=None):
+        """Yield customer_features() in chunks so large stores never sit fully in memory."""
+        if reference_date is None:
+            reference_date = self.conn.execute("SELECT MAX(last_purchase_date) FROM customer_features").fetchone()[0]
+        for d1 in pd.read_sql_query(_SELECT, self.conn, chunksize=chunksize):
+            yield _derive(d1, reference_date, recency_date)
+
+
+def _derive(d1, reference_date=None, recency_date=None):
+    # Turn stored aggregates into the preprocess_customer_d1 columns, in the same order
+    d1['avg_price_per_unit'] = d1['price_per_unit_sum'] / d1['Frequency']
+    d1['membership_start_date'] = pd.to_datetime(d1['membership_start_date'], format='%Y-%m-%d')
+    d1['last_purchase_date'] = pd.to_datetime(d1['last_purchase_date'], format='%Y-%m-%d')
+
+    if reference_date is None:
+        reference_date = d1['last_purchase_date'].max()
+    reference_date = pd.to_datetime(reference_date).normalize()
+    recency_date = pd.to_datetime(recency_date if recency_date is not None
+                                  else datetime.today().date()).normalize()
+
+    d1['Active_days'] = (reference_date - d1['membership_start_date']).dt.days.astype(int)
+    visits = d1['store_visit_frequency']
+    d1['Avg_purchase_gap_days'] = (d1['Active_days'] / visits.where(visits > 0, 1)).astype(float)
+    d1['Recency'] = (recency_date - d1['last_purchase_date']).dt.days
+
+    return d1[['customer_id', 'Monetary', 'total_quantity', 'Frequency', 'num_unique_products',
+               'last_purchase_date', 'avg_price_per_unit', 'store_visit_frequency', 'Mobile',
+               'membership_start_date', 'Active_days', 'Avg_purchase_gap_days', 'Recency']]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply daily transaction files to the customer feature store.')
+    parser.add_argument('inputs', nargs='+', help='transaction CSV/Excel files, one batch each')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='SQLite store path')
+    parser.add_argument('--batch-id', default=None,
+                        help='batch id for a single input (default: the absolute file path)')
+    args = parser.parse_args(argv)
+    if args.batch_id and len(args.inputs) > 1:
+        parser.error('--batch-id can only be used with a single input file')
+
+    with CustomerFeatureStore(args.store) as store:
+        for path in args.inputs:
+            # The full path, so dated folders holding the same file name are separate batches
+            batch_id = args.batch_id or os.path.abspath(path)
+            if store.has_batch(batch_id):
+                print(f"⚠️ Batch {batch_id} already applied, skipping {path}")
+                continue
+            touched = store.apply_batch(read_frame(path, TRANSACTION_SCHEMA), batch_id=batch_id)
+            print(f"✅ Applied {path} as batch {batch_id}: {touched} customers updated")
+
+
+if __name__ == "__main__":
+    main()
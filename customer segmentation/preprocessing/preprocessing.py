@@ -3,11 +3,11 @@
 import pandas as pd
 from datetime import datetime
 
-def preprocess_customer_d1(df):
+def preprocess_customer_d1(df, reference_date=None):
     df['purchase_date'] = pd.to_datetime(df['purchase_date']).dt.date
     df['transaction_id'] = df['customer_id'].astype(str)
 
-    d1 = df.groupby('customer_id').agg(
+    d1 = df.groupby('customer_id', observed=True).agg(
         Monetary=('total_amount', 'sum'),
         total_quantity=('quantity', 'sum'),
         Frequency=('transaction_id', 'count'),
@@ -18,11 +18,14 @@ def preprocess_customer_d1(df):
         Mobile = ('Mobile','first')
     ).reset_index()
 
-    membership_start = df.groupby('customer_id')['purchase_date'].min().reset_index()
+    membership_start = df.groupby('customer_id', observed=True)['purchase_date'].min().reset_index()
     membership_start.rename(columns={'purchase_date': 'membership_start_date'}, inplace=True)
     d1 = d1.merge(membership_start, on='customer_id', how='left')
 
-    reference_date = pd.to_datetime(d1['last_purchase_date'].max())
+    # Pass reference_date when df is only part of the history (e.g. one partition of a batch run)
+    if reference_date is None:
+        reference_date = d1['last_purchase_date'].max()
+    reference_date = pd.to_datetime(reference_date)
     today = pd.to_datetime(datetime.today().date())
 
     d1['membership_start_date'] = pd.to_datetime(d1['membership_start_date'])
@@ -64,17 +67,17 @@ def apply_reward_rules(row, freq_threshold=FREQ_THRESHOLD, monetary_threshold=MO
 
 
 
-def process_customer_d1frame(input_df, model, scaler):
-    d1 = preprocess_customer_d1(input_df)
+# Column order the CS scaler/model were fitted on
+CS_FEATURES = ['Monetary', 'Frequency', 'Recency', 'Active_days',
+               'total_quantity', 'avg_price_per_unit',
+               'store_visit_frequency', 'Avg_purchase_gap_days']
 
-    features = ['Monetary', 'Frequency', 'Recency', 'Active_days',
-                'total_quantity', 'avg_price_per_unit',
-                'store_visit_frequency', 'Avg_purchase_gap_days']
+def cluster_totals(d1):
+    return d1.groupby('cluster').agg({'Frequency': 'sum', 'Monetary': 'sum'}).reset_index()
 
-    scaled_d1 = scaler.transform(d1[features])
-    d1['cluster'] = model.predict(scaled_d1)
-
-    agg = d1.groupby('cluster').agg({'Frequency': 'sum', 'Monetary': 'sum'}).reset_index()
+def loyalty_mapping(totals):
+    # totals: per-cluster Frequency/Monetary sums; summing several cluster_totals() frames works too
+    agg = totals.groupby('cluster').agg({'Frequency': 'sum', 'Monetary': 'sum'}).reset_index()
     agg['Unit Price'] = agg['Monetary'] / agg['Frequency']
     agg = agg.sort_values('Unit Price', ascending=False).reset_index(drop=True)
 
@@ -89,12 +92,23 @@ def process_customer_d1frame(input_df, model, scaler):
     }
     agg['assigned_reward'] = agg['loyalty'].map(reward_mapping)
 
-    final = d1.merge(agg[['cluster', 'loyalty', 'assigned_reward']], on='cluster', how='left')
+    return agg[['cluster', 'loyalty', 'assigned_reward']]
+
+def apply_rewards(d1, mapping):
+    final = d1.merge(mapping, on='cluster', how='left')
 
     final[['loyalty', 'assigned_reward', 'progress_message']] = final.apply(apply_reward_rules, axis=1)
 
     return final
 
+def process_customer_d1frame(input_df, model, scaler, reference_date=None):
+    d1 = preprocess_customer_d1(input_df, reference_date)
+
+    scaled_d1 = scaler.transform(d1[CS_FEATURES])
+    d1['cluster'] = model.predict(scaled_d1)
+
+    return apply_rewards(d1, loyalty_mapping(cluster_totals(d1)))
+
 
 
 
@@ -2,43 +2,57 @@
 
 import pandas as pd
 from datetime import datetime
+from .schema import DEMOGRAPHIC_SCHEMA, read_frame
 
-def preprocess_customer_data(df):
-    
-    df['membership_start_date'] = pd.to_datetime(df['membership_start_date'], dayfirst=True)
-    df['last_purchase_date'] = pd.to_datetime(df['last_purchase_date'], dayfirst=True)
+# CS_Demo.csv style dates, e.g. 30-08-2020
+DATE_FORMAT = '%d-%m-%Y'
 
-    # Clean string columns
-    df['product_preference'] = df['product_preference'].str.lower().str.strip()
-    df['product_segment'] = df['product_segment'].str.lower().str.strip()
+def _parse_dates(series, date_format=DATE_FORMAT):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    try:
+        return pd.to_datetime(series, format=date_format, cache=True)
+    except ValueError:
+        # Files that don't follow the expected format keep the old inference path
+        return pd.to_datetime(series, dayfirst=True, cache=True)
+
+def preprocess_customer_data(df, date_format=DATE_FORMAT):
+    # Column arithmetic only; the caller's frame is left untouched
+    membership_start = _parse_dates(df['membership_start_date'], date_format)
+    last_purchase = _parse_dates(df['last_purchase_date'], date_format)
 
     # Reference date
-    reference_date = df['last_purchase_date'].max()
+    reference_date = last_purchase.max()
 
     # Feature engineering
-    df['Active_days'] = (reference_date - df['membership_start_date']).dt.days.round().astype(int)
-
-    df['Avg_purchase_gap_days'] = df.apply(
-        lambda x: x['Active_days'] / x['store_visit_frequency'] if x['store_visit_frequency'] > 0 else x['Active_days'],
-        axis=1
-    )
-
-    df['Frequency'] = (df['purchase_frequency_per_month'] * 
-                       ((df['last_purchase_date'] - df['membership_start_date']).dt.days / 30.0)).round().astype(int)
+    active_days = (reference_date - membership_start).dt.days.astype(int)
+    visits = df['store_visit_frequency']
+    avg_gap = (active_days / visits).where(visits > 0, active_days)
 
-    df['Monetary'] = df['Frequency'] * df['average_purchase_value']
-    df['Recency'] = (datetime.today() - df['last_purchase_date']).dt.days
+    frequency = (df['purchase_frequency_per_month'] *
+                 ((last_purchase - membership_start).dt.days / 30.0)).round().astype(int)
 
-    # Rename for consistency
-    df.rename(columns={'average_purchase_value': 'Avg_monetary', 
-                       'product_segment': 'Product_category'}, inplace=True)
+    return pd.DataFrame({
+        'customer_id': df['customer_id'],
+        'Mobile': df['Mobile'],
+        'product_preference': df['product_preference'].str.lower().str.strip(),
+        'store_visit_frequency': visits,
+        'Active_days': active_days,
+        'days_since_last_visit': df['days_since_last_visit'],
+        'Avg_purchase_gap_days': avg_gap,
+        'Recency': (datetime.today() - last_purchase).dt.days,
+        'Monetary': frequency * df['average_purchase_value'],
+        'Frequency': frequency,
+        'Avg_monetary': df['average_purchase_value'],
+    }, index=df.index)
 
-    selected = df[['customer_id','Mobile','product_preference', 'store_visit_frequency', 
-                   'Active_days', 'days_since_last_visit', 'Avg_purchase_gap_days',
-                   'Recency', 'Monetary', 'Frequency', 'Avg_monetary']]
-    
+def load_customer_data(source, filename=None, report=None, date_format=DATE_FORMAT):
+    """Read a CS_Demo.csv style file with the demographic dtype policy and preprocess it.
 
-    return selected
+    When a list is passed as report, a before/after memory row is appended to it.
+    """
+    df = read_frame(source, DEMOGRAPHIC_SCHEMA, filename=filename, report=report)
+    return preprocess_customer_data(df, date_format)
 
 def apply_reward_rules(row, freq_threshold=5, monetary_threshold=5000):
     if row['Frequency'] >= freq_threshold or row['Monetary'] >= monetary_threshold:
@@ -0,0 +1,187 @@
+# preprocessing/resegment.py
+
+import os
+import copy
+import json
+import pickle
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .preprocessing import CS_FEATURES, preprocess_customer_d1
+from .schema import TRANSACTION_SCHEMA, read_frame
+from .feature_store import CustomerFeatureStore
+
+MODELS_DIR = 'Models'
+VERSIONS_DIR = os.path.join(MODELS_DIR, 'versions')
+MODEL_FILE = 'CS_model.pkl'
+SCALER_FILE = 'CS_scalers.pkl'
+
+
+def iter_frame_chunks(df, chunksize=50000):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def _prior_counts(model):
+    # Versions written by resegment carry counts_; a notebook-fitted KMeans has its training labels
+    counts = getattr(model, 'counts_', None)
+    if counts is None:
+        counts = np.bincount(model.labels_, minlength=len(model.cluster_centers_))
+    return np.asarray(counts, dtype=float)
+
+
+def resegment(chunk_source, model, scaler, update_scaler=False, n_passes=1, batch_size=1024,
+              prior_weight=1.0):
+    """Refresh cluster centroids with mini-batch passes instead of a full refit.
+
+    chunk_source is a callable returning a fresh iterator of feature frames (CS_FEATURES columns),
+    e.g. lambda: store.iter_customer_features(). Each centroid is a running mean that starts from
+    the current model with its prior count, c <- (n*c + sum(x)) / (n + m), so a small batch only
+    nudges the centroids and cluster ids (and loyalty tiers) stay stable. prior_weight < 1 lets
+    older data fade. With update_scaler, a copy of the scaler is partial_fit on the chunks first
+    and the centroids are mapped into the updated scale.
+    Returns (model, scaler, stats).
+    """
+    old_centers = model.cluster_centers_
+    if update_scaler:
+        new_scaler = copy.deepcopy(scaler)
+        for chunk in chunk_source():
+            new_scaler.partial_fit(chunk[CS_FEATURES])
+        # The scalers were fitted on named columns, so keep the names through the round trip
+        raw_centers = pd.DataFrame(scaler.inverse_transform(pd.DataFrame(old_centers, columns=CS_FEATURES)),
+                                   columns=CS_FEATURES)
+        old_centers = new_scaler.transform(raw_centers)
+        scaler = new_scaler
+
+    # KMeans.predict needs C-ordered centroids; scaling a DataFrame can return Fortran order
+    centers = np.array(old_centers, dtype=float, order='C')
+    counts = _prior_counts(model) * prior_weight
+    n_rows = 0
+    for _ in range(n_passes):
+        for chunk in chunk_source():
+            scaled = scaler.transform(chunk[CS_FEATURES])
+            for start in range(0, len(scaled), batch_size):
+                batch = scaled[start:start + batch_size]
+                labels = ((batch[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+                for k in np.unique(labels):
+                    members = batch[labels == k]
+                    centers[k] = (counts[k] * centers[k] + members.sum(axis=0)) / (counts[k] + len(members))
+                    counts[k] += len(members)
+            n_rows += len(chunk)
+
+    new_model = copy.deepcopy(model)
+    new_model.cluster_centers_ = centers
+    new_model.counts_ = counts
+
+    stats = {
+        'rows_seen': n_rows,
+        'n_passes': n_passes,
+        'batch_size': batch_size,
+        'update_scaler': update_scaler,
+        'prior_weight': prior_weight,
+        'centroid_shift': float(((centers - old_centers) ** 2).sum(axis=1).max() ** 0.5),
+    }
+    return new_model, scaler, stats
+
+
+def save_version(model, scaler, meta=None, versions_dir=VERSIONS_DIR):
+    """Write model/scaler under versions_dir/<version>/ and point CURRENT at it."""
+    # Microseconds plus a counter, so runs started together never collide on a version name
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    version, n = stamp, 0
+    while True:
+        path = os.path.join(versions_dir, version)
+        try:
+            os.makedirs(path)
+            break
+        except FileExistsError:
+            n += 1
+            version = f'{stamp}-{n}'
+
+    with open(os.path.join(path, MODEL_FILE), 'wb') as f:
+        pickle.dump(model, f)
+    with open(os.path.join(path, SCALER_FILE), 'wb') as f:
+        pickle.dump(scaler, f)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(dict(meta or {}, version=version), f, indent=2)
+
+    # Swap the pointer atomically so readers never see a half-written version
+    tmp = os.path.join(versions_dir, f'CURRENT.{version}.tmp')
+    with open(tmp, 'w') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(versions_dir, 'CURRENT'))
+    return version
+
+
+class ModelRegistry:
+    """Serves the current CS model/scaler pair, reloading when CURRENT changes.
+
+    Falls back to Models/CS_model.pkl and Models/CS_scalers.pkl until a version has been saved.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
+        self.versions_dir = os.path.join(models_dir, 'versions')
+        self.version = None
+        self._pair = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        try:
+            with open(os.path.join(self.versions_dir, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        version = self._current_version()
+        with self._lock:
+            if self._pair is None or version != self.version:
+                path = os.path.join(self.versions_dir, version) if version else self.models_dir
+                with open(os.path.join(path, MODEL_FILE), 'rb') as f:
+                    model = pickle.load(f)
+                with open(os.path.join(path, SCALER_FILE), 'rb') as f:
+                    scaler = pickle.load(f)
+                self._pair = (model, scaler)
+                self.version = version
+            return self._pair
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh CS_model centroids with count-weighted mini-batch passes.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--store', help='CustomerFeatureStore SQLite path')
+    source.add_argument('--input', help='transaction CSV/Excel file')
+    parser.add_argument('--chunksize', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--passes', type=int, default=1)
+    parser.add_argument('--update-scaler', action='store_true')
+    parser.add_argument('--prior-weight', type=float, default=1.0,
+                        help='weight of the current centroids, as a multiple of their point counts')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.models_dir)
+    model, scaler = registry.get()
+
+    if args.store:
+        store = CustomerFeatureStore(args.store)
+        chunk_source = lambda: store.iter_customer_features(chunksize=args.chunksize)
+    else:
+        d1 = preprocess_customer_d1(read_frame(args.input, TRANSACTION_SCHEMA))
+        chunk_source = lambda: iter_frame_chunks(d1, args.chunksize)
+
+    model, scaler, stats = resegment(chunk_source, model, scaler, update_scaler=args.update_scaler,
+                                     n_passes=args.passes, batch_size=args.batch_size,
+                                     prior_weight=args.prior_weight)
+    meta = dict(stats, source=args.store or args.input, parent_version=registry.version)
+    version = save_version(model, scaler, meta, os.path.join(args.models_dir, 'versions'))
+    print(f"✅ Saved CS model version {version}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# preprocessing/schema.py
+
+import pandas as pd
+
+# Column policies:
+#   'id'       -> integer codes (downcast) when numeric, categorical otherwise
+#   'category' -> pandas categorical
+#   'numeric'  -> smallest lossless numeric dtype
+#   'mobile'   -> read as text (never float), normalised and stored as categorical
+TRANSACTION_SCHEMA = {
+    'transaction_id': 'id',
+    'customer_id': 'id',
+    'product_id': 'category',
+    'product_name': 'category',
+    'category': 'category',
+    'payment_method': 'category',
+    'store_location': 'category',
+    'quantity': 'numeric',
+    'price_per_unit': 'numeric',
+    'total_amount': 'numeric',
+    'Mobile': 'mobile',
+}
+
+DEMOGRAPHIC_SCHEMA = {
+    'customer_id': 'id',
+    'age': 'numeric',
+    'gender': 'category',
+    'average_purchase_value': 'numeric',
+    'purchase_frequency_per_month': 'numeric',
+    'product_preference': 'category',
+    'preferred_channel': 'category',
+    'store_visit_frequency': 'numeric',
+    'days_since_last_visit': 'numeric',
+    'product_segment': 'category',
+    'Mobile': 'mobile',
+}
+
+
+def _downcast(series):
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series):
+        # Only narrow floats when float32 holds every value exactly
+        narrow = series.astype('float32')
+        same = (narrow.astype('float64') == series) | (series.isna() & narrow.isna())
+        return narrow if same.all() else series
+    return series
+
+
+def _mobile(series):
+    text = series.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return text.where(series.notna()).astype('category')
+
+
+def optimize_dtypes(df, schema=TRANSACTION_SCHEMA):
+    """Return a copy of df cast to the compact dtypes described by schema."""
+    df = df.copy()
+    for col, policy in schema.items():
+        if col not in df.columns:
+            continue
+        if policy == 'id':
+            if pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = _downcast(df[col])
+            else:
+                df[col] = df[col].astype('category')
+        elif policy == 'category':
+            df[col] = df[col].astype('category')
+        elif policy == 'numeric':
+            df[col] = _downcast(df[col])
+        elif policy == 'mobile':
+            df[col] = _mobile(df[col])
+        else:
+            raise ValueError(f"Unknown dtype policy '{policy}' for column '{col}'")
+    return df
+
+
+def normalize_ids(df, col='customer_id'):
+    """Drop rows without an id and give ids the same form in every file or chunk.
+
+    A single missing id turns the column into float (1 -> 1.0), and a stray text value turns it
+    into strings ('1'); either would no longer match the same customer read elsewhere.
+    """
+    df = df[df[col].notna()]
+    ids = df[col]
+    if not pd.api.types.is_numeric_dtype(ids):
+        as_number = pd.to_numeric(ids.astype(str), errors='coerce')
+        if as_number.notna().all():
+            ids = as_number
+    if pd.api.types.is_float_dtype(ids) and (ids % 1 == 0).all():
+        ids = ids.astype('int64')
+    return df.assign(**{col: ids})
+
+
+def frame_memory(name, before, after):
+    before_bytes = int(before.memory_usage(deep=True).sum())
+    after_bytes = int(after.memory_usage(deep=True).sum())
+    return {
+        'frame': name,
+        'rows': len(after),
+        'before_mb': round(before_bytes / 2**20, 3),
+        'after_mb': round(after_bytes / 2**20, 3),
+        'saved_pct': round(100 * (1 - after_bytes / before_bytes), 1) if before_bytes else 0.0,
+    }
+
+
+def memory_report(rows):
+    """Tabulate the per-frame rows collected by read_frame(report=...)."""
+    return pd.DataFrame(rows, columns=['frame', 'rows', 'before_mb', 'after_mb', 'saved_pct'])
+
+
+def _text_cols(schema):
+    # Phone numbers must never go through float parsing (9.18281E+11)
+    return {col: str for col, policy in schema.items() if policy == 'mobile'}
+
+
+def read_frame(source, schema=TRANSACTION_SCHEMA, filename=None, report=None):
+    """Read a CSV/Excel file (path or upload) and apply the dtype policy.
+
+    When a list is passed as report, a before/after memory row is appended to it.
+    """
+    filename = filename or getattr(source, 'filename', None) or str(source)
+    text_cols = _text_cols(schema)
+
+    if filename.lower().endswith('.csv'):
+        raw = pd.read_csv(source, dtype=text_cols)
+    else:
+        raw = pd.read_excel(source, dtype=text_cols)
+
+    df = optimize_dtypes(raw, schema)
+    if report is not None:
+        report.append(frame_memory(filename, raw, df))
+    return df
+
+
+def read_frame_chunks(path, schema=TRANSACTION_SCHEMA, chunksize=100000):
+    """Yield dtype-optimised chunks of a CSV/Excel file.
+
+    CSVs are streamed; Excel has no chunked reader, so the sheet is loaded once and sliced.
+    """
+    if str(path).lower().endswith('.csv'):
+        for chunk in pd.read_csv(path, dtype=_text_cols(schema), chunksize=chunksize):
+            yield optimize_dtypes(chunk, schema)
+    else:
+        df = read_frame(path, schema)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
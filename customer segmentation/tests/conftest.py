@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app modules the same way app.py does, from the project directory
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_DIR, 'data')
+sys.path.insert(0, PROJECT_DIR)
+
+
+@pytest.fixture(scope='session')
+def data_dir():
+    return DATA_DIR
@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+
+from batch_score import CHURN_COLUMNS, partition_inputs, run
+from preprocessing.churn import load_churn_models, score_churn
+from preprocessing.preprocessing import (CS_FEATURES, cluster_totals, loyalty_mapping, preprocess_customer_d1,
+                                         process_customer_d1frame)
+from preprocessing.resegment import ModelRegistry
+from preprocessing.schema import TRANSACTION_SCHEMA, read_frame
+
+
+def _customer_partitions(tx_dir):
+    seen = {}
+    for part in os.listdir(tx_dir):
+        part_dir = os.path.join(tx_dir, part)
+        for name in os.listdir(part_dir):
+            for cid in pd.read_pickle(os.path.join(part_dir, name))['customer_id'].unique():
+                seen.setdefault(cid, set()).add(part)
+    return seen
+
+
+def test_missing_id_does_not_split_a_customer(tmp_path, data_dir):
+    history = read_frame(os.path.join(data_dir, 'CS_Main.xlsx'), TRANSACTION_SCHEMA)
+    history = history.astype({'customer_id': 'float64'})
+    # One missing id makes that chunk's customer_id column float when read back
+    history.loc[history.index[3], 'customer_id'] = None
+    path = str(tmp_path / 'tx.csv')
+    history.to_csv(path, index=False, float_format='%.0f')
+
+    tx_dir = str(tmp_path / 'tx')
+    n_rows, n_dropped, max_date = partition_inputs([path], tx_dir, n_partitions=4, chunksize=200)
+
+    assert n_dropped == 1
+    assert n_rows == len(history) - 1
+    assert max_date == pd.to_datetime(history['purchase_date']).max()
+
+    seen = _customer_partitions(tx_dir)
+    assert len(seen) == history['customer_id'].nunique()
+    assert all(len(parts) == 1 for parts in seen.values())
+    assert all(float(cid).is_integer() and not isinstance(cid, float) for cid in seen)
+
+
+def test_partitioned_run_matches_single_frame(tmp_path, data_dir):
+    models_dir = os.path.join(os.path.dirname(data_dir), 'Models')
+    path = str(tmp_path / 'tx.csv')
+    read_frame(os.path.join(data_dir, 'CS_Main.xlsx'), TRANSACTION_SCHEMA).to_csv(path, index=False)
+    out_dir = str(tmp_path / 'out')
+    os.makedirs(out_dir)
+
+    summary = run([path], out_dir, workers=1, partitions=3, chunksize=300, models_dir=models_dir)
+
+    seg_dir = os.path.join(out_dir, 'segments')
+    assert len(os.listdir(seg_dir)) == summary['partitions'] == 3
+    got = pd.concat([pd.read_csv(os.path.join(seg_dir, name)) for name in sorted(os.listdir(seg_dir))])
+
+    # Single frame: reference date and loyalty mapping come from the whole extract
+    tx = read_frame(path, TRANSACTION_SCHEMA)
+    model, scaler = ModelRegistry(models_dir).get()
+    expected = process_customer_d1frame(tx.copy(), model, scaler)
+    churn = score_churn(preprocess_customer_d1(tx.copy()), *load_churn_models(models_dir))
+    expected = expected.merge(churn[CHURN_COLUMNS], on='customer_id', how='left')
+    expected_path = str(tmp_path / 'expected.csv')
+    expected.to_csv(expected_path, index=False)
+    expected = pd.read_csv(expected_path)
+
+    d1 = preprocess_customer_d1(tx.copy())
+    d1['cluster'] = model.predict(scaler.transform(d1[CS_FEATURES]))
+    assert summary['loyalty_mapping'] == loyalty_mapping(cluster_totals(d1)).to_dict(orient='records')
+    assert summary['customers'] == len(expected)
+
+    got = got.sort_values('customer_id').reset_index(drop=True)
+    expected = expected.sort_values('customer_id').reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-5)
@@ -0,0 +1,116 @@
+import os
+
+import pandas as pd
+import pytest
+
+from preprocessing.feature_store import CustomerFeatureStore, main
+from preprocessing.preprocessing import preprocess_customer_d1
+from preprocessing.schema import TRANSACTION_SCHEMA, read_frame
+
+RECENCY_DATE = '2025-06-30'
+
+
+@pytest.fixture(scope='module')
+def history(data_dir):
+    return read_frame(os.path.join(data_dir, 'CS_Main.xlsx'), TRANSACTION_SCHEMA)
+
+
+def _expected(history):
+    d1 = preprocess_customer_d1(history.copy())
+    # preprocess_customer_d1 measures Recency against today
+    today = pd.Timestamp.today().normalize()
+    d1['Recency'] = d1['Recency'] - (today - pd.Timestamp(RECENCY_DATE)).days
+    return d1
+
+
+def _compare(store_frame, expected):
+    store_frame = store_frame.copy()
+    expected = expected.copy()
+    store_frame['Mobile'] = store_frame['Mobile'].astype(str)
+    expected['Mobile'] = expected['Mobile'].astype(str)
+    pd.testing.assert_frame_equal(store_frame, expected, check_dtype=False)
+
+
+def test_daily_batches_match_full_recompute(tmp_path, history):
+    with CustomerFeatureStore(str(tmp_path / 'store.db')) as store:
+        days = history['purchase_date'].dt.date
+        for day, batch in history.groupby(days):
+            store.apply_batch(batch, batch_id=str(day))
+        features = store.customer_features(recency_date=RECENCY_DATE)
+
+    _compare(features, _expected(history))
+
+
+def test_reapplying_batch_id_is_noop(tmp_path, history):
+    with CustomerFeatureStore(str(tmp_path / 'store.db')) as store:
+        assert store.apply_batch(history, batch_id='full') > 0
+        before = store.customer_features(recency_date=RECENCY_DATE)
+
+        assert store.apply_batch(history, batch_id='full') == 0
+        after = store.customer_features(recency_date=RECENCY_DATE)
+
+    pd.testing.assert_frame_equal(before, after)
+    _compare(after, _expected(history))
+
+
+def test_float_and_text_ids_map_to_one_customer(tmp_path, history):
+    first, second, third = (history.iloc[i::3] for i in range(3))
+    # A blank id makes pandas read the whole column as float
+    floats = second.astype({'customer_id': 'float64'})
+    floats = pd.concat([floats, floats.iloc[:1].assign(customer_id=None)])
+    # Ids read as text, e.g. because the column held a junk value elsewhere in the file
+    text = third.assign(customer_id=third['customer_id'].astype(str).astype('category'))
+
+    with CustomerFeatureStore(str(tmp_path / 'store.db')) as store:
+        store.apply_batch(first, batch_id='day-1')
+        store.apply_batch(floats, batch_id='day-2')
+        store.apply_batch(text, batch_id='day-3')
+        features = store.customer_features(recency_date=RECENCY_DATE)
+
+    assert pd.api.types.is_integer_dtype(features['customer_id'])
+    assert len(features) == history['customer_id'].nunique()
+    _compare(features, _expected(history))
+
+
+def test_text_ids_stay_text(tmp_path, history):
+    batch = history.assign(customer_id='CUST' + history['customer_id'].astype(str))
+    with CustomerFeatureStore(str(tmp_path / 'store.db')) as store:
+        store.apply_batch(batch, batch_id='day-1')
+        features = store.customer_features(recency_date=RECENCY_DATE)
+
+    assert len(features) == history['customer_id'].nunique()
+    assert features['customer_id'].str.startswith('CUST').all()
+
+
+def test_main_applies_file_once(tmp_path, history):
+    path = str(tmp_path / 'day.csv')
+    history.to_csv(path, index=False)
+    db = str(tmp_path / 'store.db')
+
+    main([path, '--store', db])
+    main([path, '--store', db])
+
+    with CustomerFeatureStore(db) as store:
+        features = store.customer_features(recency_date=RECENCY_DATE)
+    assert features['Frequency'].sum() == len(history)
+    assert features['Monetary'].sum() == history['total_amount'].sum()
+
+
+def test_main_same_file_name_in_dated_folders(tmp_path, history):
+    days = sorted(history['purchase_date'].dt.date.unique())
+    split = days[len(days) // 2]
+    paths = []
+    for folder, batch in (('2025-06-01', history[history['purchase_date'].dt.date < split]),
+                          ('2025-06-02', history[history['purchase_date'].dt.date >= split])):
+        os.makedirs(tmp_path / folder)
+        path = str(tmp_path / folder / 'transactions.csv')
+        batch.to_csv(path, index=False)
+        paths.append(path)
+    db = str(tmp_path / 'store.db')
+
+    for path in paths:
+        main([path, '--store', db])
+
+    with CustomerFeatureStore(db) as store:
+        features = store.customer_features(recency_date=RECENCY_DATE)
+    assert features['Frequency'].sum() == len(history)
@@ -0,0 +1,73 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from preprocessing.process import preprocess_customer_data
+
+
+def baseline_preprocess_customer_data(df):
+    # Frozen copy of the row-wise implementation the vectorised version replaced
+    df['membership_start_date'] = pd.to_datetime(df['membership_start_date'], dayfirst=True)
+    df['last_purchase_date'] = pd.to_datetime(df['last_purchase_date'], dayfirst=True)
+
+    df['product_preference'] = df['product_preference'].str.lower().str.strip()
+    df['product_segment'] = df['product_segment'].str.lower().str.strip()
+
+    reference_date = df['last_purchase_date'].max()
+
+    df['Active_days'] = (reference_date - df['membership_start_date']).dt.days.round().astype(int)
+
+    df['Avg_purchase_gap_days'] = df.apply(
+        lambda x: x['Active_days'] / x['store_visit_frequency'] if x['store_visit_frequency'] > 0 else x['Active_days'],
+        axis=1
+    )
+
+    df['Frequency'] = (df['purchase_frequency_per_month'] *
+                       ((df['last_purchase_date'] - df['membership_start_date']).dt.days / 30.0)).round().astype(int)
+
+    df['Monetary'] = df['Frequency'] * df['average_purchase_value']
+    df['Recency'] = (datetime.today() - df['last_purchase_date']).dt.days
+
+    df.rename(columns={'average_purchase_value': 'Avg_monetary',
+                       'product_segment': 'Product_category'}, inplace=True)
+
+    return df[['customer_id', 'Mobile', 'product_preference', 'store_visit_frequency',
+               'Active_days', 'days_since_last_visit', 'Avg_purchase_gap_days',
+               'Recency', 'Monetary', 'Frequency', 'Avg_monetary']]
+
+
+@pytest.fixture
+def demo(data_dir):
+    df = pd.read_csv(os.path.join(data_dir, 'CS_Demo.csv'))
+    # Exercise the store_visit_frequency == 0 branch
+    df.loc[df.index[:25], 'store_visit_frequency'] = 0
+    return df
+
+
+def test_matches_baseline(demo):
+    expected = baseline_preprocess_customer_data(demo.copy())
+    result = preprocess_customer_data(demo)
+
+    pd.testing.assert_frame_equal(result, expected)
+    zero_visits = demo['store_visit_frequency'] == 0
+    assert zero_visits.any()
+    assert (result.loc[zero_visits, 'Avg_purchase_gap_days'] == result.loc[zero_visits, 'Active_days']).all()
+
+
+def test_does_not_mutate_input(demo):
+    before = demo.copy()
+    preprocess_customer_data(demo)
+    pd.testing.assert_frame_equal(demo, before)
+
+
+def test_dayfirst_fallback_matches_baseline(demo):
+    # Slash-separated dates don't match the fixed format and go through dayfirst inference
+    for col in ('membership_start_date', 'last_purchase_date'):
+        demo[col] = pd.to_datetime(demo[col], format='%d-%m-%Y').dt.strftime('%d/%m/%Y')
+
+    expected = baseline_preprocess_customer_data(demo.copy())
+    result = preprocess_customer_data(demo)
+
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,83 @@
+import os
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from preprocessing.preprocessing import CS_FEATURES
+from preprocessing.resegment import (MODEL_FILE, SCALER_FILE, ModelRegistry, iter_frame_chunks,
+                                     resegment, save_version)
+
+
+def _blobs(n_per_cluster, seed):
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform(0, 100, size=(4, len(CS_FEATURES)))
+    points = np.vstack([c + rng.normal(0, 3, size=(n_per_cluster, len(CS_FEATURES))) for c in centers])
+    return pd.DataFrame(points, columns=CS_FEATURES)
+
+
+def _fitted(history):
+    scaler = StandardScaler().fit(history[CS_FEATURES])
+    model = KMeans(n_clusters=4, n_init=10, random_state=42).fit(scaler.transform(history[CS_FEATURES]))
+    return model, scaler
+
+
+def test_small_batch_keeps_cluster_ids():
+    history = _blobs(250, seed=0)
+    model, scaler = _fitted(history)
+    # A small, lopsided batch: every row comes from the first blob
+    batch = _blobs(250, seed=0).iloc[:20] + 1.0
+
+    new_model, new_scaler, stats = resegment(lambda: iter_frame_chunks(batch, 10), model, scaler,
+                                             batch_size=8)
+
+    before = model.predict(scaler.transform(history[CS_FEATURES]))
+    after = new_model.predict(new_scaler.transform(history[CS_FEATURES]))
+    assert (before == after).all()
+    assert stats['centroid_shift'] < 0.1
+    assert stats['rows_seen'] == len(batch)
+    assert new_model.counts_.sum() == len(history) + len(batch)
+
+
+def test_update_scaler_keeps_cluster_ids():
+    history = _blobs(250, seed=1)
+    model, scaler = _fitted(history)
+    batch = _blobs(250, seed=1).sample(40, random_state=0)
+
+    new_model, new_scaler, _ = resegment(lambda: iter_frame_chunks(batch, 16), model, scaler,
+                                         update_scaler=True)
+
+    before = model.predict(scaler.transform(history[CS_FEATURES]))
+    after = new_model.predict(new_scaler.transform(history[CS_FEATURES]))
+    assert (before == after).all()
+
+
+def test_save_version_same_second_and_hot_swap(tmp_path):
+    history = _blobs(100, seed=2)
+    model, scaler = _fitted(history)
+    for name, obj in ((MODEL_FILE, model), (SCALER_FILE, scaler)):
+        with open(tmp_path / name, 'wb') as f:
+            pickle.dump(obj, f)
+    registry = ModelRegistry(str(tmp_path))
+    base_model, _ = registry.get()
+    assert registry.version is None
+
+    new_model, new_scaler, stats = resegment(lambda: iter_frame_chunks(history, 50), model, scaler)
+    versions_dir = str(tmp_path / 'versions')
+    first = save_version(model, scaler, versions_dir=versions_dir)
+    second = save_version(new_model, new_scaler, stats, versions_dir=versions_dir)
+
+    assert first != second
+    assert sorted(os.listdir(versions_dir)) == sorted([first, second, 'CURRENT'])
+    with open(os.path.join(versions_dir, second, 'meta.json')) as f:
+        assert json.load(f)['version'] == second
+
+    served, _ = registry.get()
+    assert registry.version == second
+    assert served is not base_model
+    np.testing.assert_array_equal(served.counts_, new_model.counts_)
+    # Unchanged CURRENT serves the cached pair
+    assert registry.get()[0] is served